@@ -4,73 +4,73 @@
 Uses full addresses (street + house number + postcode + city) for precise locations
 """
 
+import asyncio
+import aiohttp
+from aiolimiter import AsyncLimiter
+import orjson
+import numpy as np
 import pandas as pd
-import requests
-import time
-import json
-from pathlib import Path
 
-def geocode_with_nominatim(address, cache):
-    """Geocode using Nominatim (OpenStreetMap) API"""
+from lib.config import DATA_FILE_ACCURATE, DATA_FILE_ACCURATE_PARQUET
+from lib.data import write_parquet_copy
+from lib.geocache import load_cache
+from lib.geocoding import NOMINATIM_URL, HEADERS, build_full_addresses, retry_delay
+
+# Concurrent in-flight requests (public Nominatim tolerates ~1 rps; use 16-32 for a self-hosted instance)
+MAX_CONCURRENT_REQUESTS = 8
+# Token bucket: at most RATE_LIMIT requests per RATE_PERIOD seconds
+RATE_LIMIT = 1
+RATE_PERIOD = 1.1
+MAX_RETRIES = 3  # retries on HTTP 429, honouring Retry-After
+
+async def geocode_one(session, sem, limiter, address, cache):
+    """Geocode a single address using Nominatim (OpenStreetMap) API"""
+    # Cache hits return immediately without charging the rate limiter
     if address in cache:
         return cache[address]
     
-    try:
-        # Use Nominatim API directly
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': address,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'nl',  # Limit to Netherlands
-            'addressdetails': 1
-        }
-        
-        headers = {
-            'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                result = (float(data[0]['lat']), float(data[0]['lon']))
-                cache[address] = result
-                return result
-        
-        cache[address] = None
-        return None
+    params = {
+        'q': address,
+        'format': 'json',
+        'limit': 1,
+        'countrycodes': 'nl',  # Limit to Netherlands
+        'addressdetails': 1
+    }
+    
+    async with sem:
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                # Rate limiting - only the actual HTTP request takes a token
+                async with limiter:
+                    async with session.get(NOMINATIM_URL, params=params) as response:
+                        if response.status == 429 and attempt < MAX_RETRIES:
+                            delay = retry_delay(response, attempt)
+                        elif response.status == 200:
+                            data = await response.json(loads=orjson.loads)
+                            if data:
+                                result = (float(data[0]['lat']), float(data[0]['lon']))
+                                cache[address] = result
+                                return result
+                            break
+                        else:
+                            break
+                await asyncio.sleep(delay)
+            
+            cache[address] = None
+            return None
         
-    except Exception as e:
-        print(f"Error geocoding {address}: {e}")
-        cache[address] = None
-        return None
+        except Exception as e:
+            print(f"Error geocoding {address}: {e}")
+            cache[address] = None
+            return None
 
-def create_full_address(row):
-    """Create a full address string for geocoding"""
-    parts = []
-    
-    # Street and house number
-    if pd.notna(row['street']):
-        street_part = str(row['street']).strip()
-        if pd.notna(row['house_no']):
-            street_part += f" {str(row['house_no']).strip()}"
-            if pd.notna(row['house_add']):
-                street_part += str(row['house_add']).strip()
-        parts.append(street_part)
-    
-    # Postcode and city
-    if pd.notna(row['postcode']):
-        parts.append(str(row['postcode']).strip())
-    
-    if pd.notna(row['city']):
-        parts.append(str(row['city']).strip())
-    
-    # Always add Netherlands
-    parts.append("Netherlands")
-    
-    return ", ".join(parts)
+async def geocode_addresses(addresses, cache):
+    """Geocode addresses concurrently over one shared keep-alive session"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limiter = AsyncLimiter(max_rate=RATE_LIMIT, time_period=RATE_PERIOD)
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+        return await asyncio.gather(*[geocode_one(session, sem, limiter, address, cache) for address in addresses])
 
 def main():
     print("🎯 Accurate Geocoding for Dutch Schools")
@@ -81,22 +81,18 @@ def main():
     print(f"📊 Loaded {len(df):,} schools")
     
     # Load existing cache
-    cache_file = Path('accurate_geocoding_cache.json')
-    if cache_file.exists():
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
+    cache = load_cache()
+    if cache:
         print(f"📋 Loaded {len(cache)} cached coordinates")
-    else:
-        cache = {}
     
     # Add coordinate columns if they don't exist
     if 'latitude' not in df.columns:
-        df['latitude'] = None
+        df['latitude'] = np.nan
     if 'longitude' not in df.columns:
-        df['longitude'] = None
+        df['longitude'] = np.nan
     
     # Create full addresses
-    df['full_address'] = df.apply(create_full_address, axis=1)
+    df['full_address'] = build_full_addresses(df)
     
     # Show sample addresses
     print("\n📍 Sample addresses to geocode:")
@@ -104,48 +100,57 @@ def main():
         print(f"  {i+1}. {addr}")
     
     # Geocode schools that don't have coordinates
-    geocoded_count = 0
-    total_to_geocode = df[(df['latitude'].isna()) | (df['longitude'].isna())].shape[0]
+    missing = (df['latitude'].isna() | df['longitude'].isna()).to_numpy()
+    needs_geocoding = df[missing]
+    total_to_geocode = needs_geocoding.shape[0]
     
-    print(f"\n🔍 Need to geocode {total_to_geocode} schools")
-    print("⏳ This may take a while due to rate limiting...")
+    # Each distinct address is only sent to the API once
+    addresses = needs_geocoding['full_address']
+    unique_addresses = addresses.drop_duplicates().tolist()
+    to_fetch = [address for address in unique_addresses if address not in cache]
     
-    for idx, row in df.iterrows():
-        if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-            address = row['full_address']
-            
-            coords = geocode_with_nominatim(address, cache)
-            
-            if coords:
-                df.at[idx, 'latitude'] = coords[0]
-                df.at[idx, 'longitude'] = coords[1]
-                geocoded_count += 1
-                
-                if geocoded_count % 5 == 0:
-                    print(f"✅ Geocoded {geocoded_count}/{total_to_geocode} schools")
-                    # Save cache periodically
-                    with open(cache_file, 'w') as f:
-                        json.dump(cache, f)
-            else:
-                print(f"❌ Failed to geocode: {row['school_name']} - {address}")
-            
-            # Rate limiting - be respectful to the API
-            time.sleep(1.5)  # 1.5 seconds between requests
+    print(f"\n🔍 Need to geocode {total_to_geocode} schools ({len(to_fetch)} new unique addresses)")
+    print(f"⏳ Running up to {MAX_CONCURRENT_REQUESTS} requests concurrently...")
     
-    # Save final cache
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
+    try:
+        asyncio.run(geocode_addresses(to_fetch, cache))
+    finally:
+        # Flush remaining cache entries even if the run is interrupted
+        cache.close()
+    
+    # Broadcast results to every school sharing an address, then write
+    # all new coordinates back in one vectorized assignment
+    resolved = {address: cache[address] for address in unique_addresses if cache.get(address)}
+    new_lat = addresses.map({address: c[0] for address, c in resolved.items()}).to_numpy(dtype=float)
+    new_lon = addresses.map({address: c[1] for address, c in resolved.items()}).to_numpy(dtype=float)
+    found = ~np.isnan(new_lat)
+    positions = np.flatnonzero(missing)[found]
+    lat = df['latitude'].to_numpy(dtype=float, copy=True)
+    lon = df['longitude'].to_numpy(dtype=float, copy=True)
+    lat[positions] = new_lat[found]
+    lon[positions] = new_lon[found]
+    df['latitude'] = lat
+    df['longitude'] = lon
+    geocoded_count = int(found.sum())
+    
+    failed = needs_geocoding[~found]
+    for name, address in zip(failed['school_name'], failed['full_address']):
+        print(f"❌ Failed to geocode: {name} - {address}")
+    
+    print(f"✅ Geocoded {geocoded_count}/{total_to_geocode} schools")
     
     # Save updated dataset
-    df_output = df.drop('full_address', axis=1)  # Remove the temporary address column
-    df_output.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
+    del df['full_address']  # Remove the temporary address column in place, no copy
+    df.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
+    # Typed Parquet copy (categoricals + bool flags) the dashboard loads
+    write_parquet_copy(DATA_FILE_ACCURATE, DATA_FILE_ACCURATE_PARQUET)
     
     # Statistics
-    with_coords = df_output[(df_output['latitude'].notna()) & (df_output['longitude'].notna())]
+    with_coords = df[(df['latitude'].notna()) & (df['longitude'].notna())]
     print(f"\n📊 ACCURATE GEOCODING RESULTS:")
     print(f"✅ Schools with coordinates: {len(with_coords):,}/{len(df):,} ({len(with_coords)/len(df)*100:.1f}%)")
     print(f"🆕 Newly geocoded: {geocoded_count:,}")
-    print(f"💾 Saved to: nl_highschools_accurate_coordinates.csv")
+    print(f"💾 Saved to: nl_highschools_accurate_coordinates.csv (+ .parquet)")
     
     # Show sample coordinates with addresses
     print(f"\n📍 SAMPLE ACCURATE COORDINATES:")
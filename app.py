@@ -5,17 +5,20 @@ An interactive web application for exploring the comprehensive dataset of Dutch
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import folium
-from streamlit_folium import st_folium
 
 # Examify modular utilities
-from lib.data import load_schools as load_schools_lib, toggle_client
-from lib.maps import build_map
-from lib.config import ID_COL, NAME_COL, CITY_COL, PROVINCE_COL, IS_CLIENT_COL
+from lib.data import (
+    LOADER_VERSION, SEARCH_COL, WEBSITE_NORM_COL, load_schools as load_schools_lib, load_clients, optimize_dtypes,
+    resolve_data_file, search_mask, toggle_client,
+)
+from lib.config import (
+    ID_COL, NAME_COL, CITY_COL, PROVINCE_COL, MUNICIPALITY_COL, LAT_COL, LON_COL, IS_CLIENT_COL,
+    RELEVANT_LEVELS, DASHBOARD_COLS, NL_CENTER, DEFAULT_ZOOM
+)
 
 # Page configuration
 st.set_page_config(
@@ -46,18 +49,226 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data(show_spinner=False)
+@st.cache_data(persist="disk", show_spinner="Loading schools…", max_entries=2)
+def load_base_data(data_file: str, data_mtime: float, columns: tuple, loader_version: int):
+    """Decoded, trimmed and dtype-optimized schools frame, without client flags.
+    Persisted to disk so a restarted app unpickles it instead of re-parsing the dataset;
+    data_file and data_mtime key it to the file currently on disk, columns to the kept column set,
+    loader_version to lib.data's loader (Streamlit only hashes this function's own source).
+    """
+    _ = data_file, data_mtime, loader_version  # used for caching key
+    # Arrow-backed dtypes hand off to Streamlit/Plotly without a pandas->Arrow copy
+    df = load_schools_lib(with_client_flag=False, dtype_backend='pyarrow')
+    # Keep only what the dashboard reads (plus the loader's search/website columns), at the narrowest types that hold it
+    df = df.drop(columns=[c for c in df.columns if c not in columns and c not in (SEARCH_COL, WEBSITE_NORM_COL)])
+    if 'enrollment_total' in df.columns:
+        df['enrollment_total'] = pd.to_numeric(df['enrollment_total'], downcast='unsigned')
+    # float32 is ~1 m precision at Dutch latitudes, plenty for map markers
+    df[[LAT_COL, LON_COL]] = df[[LAT_COL, LON_COL]].astype('float32[pyarrow]')
+    # Categoricals for cheap filters/counts, plain bools for level flags
+    optimize_dtypes(df)
+    # Per-school level count is invariant, so derive it once here
+    relevant_cols = [c for c in RELEVANT_LEVELS if c in df.columns]
+    df['level_count'] = df[relevant_cols].sum(axis=1).astype('uint8') if relevant_cols else 0
+    return df
+
+@st.cache_resource(show_spinner="Loading schools…", max_entries=4)
 def load_data(clients_version: int = 0):
     """Load schools with coordinates and client flags via lib.data.
     The clients_version param breaks cache when client set changes.
+    The frame is shared by all sessions (no per-call copy) and must be treated as read-only.
     """
     try:
         _ = clients_version  # used for caching key
-        return load_schools_lib(with_client_flag=True)
+        data_file = resolve_data_file()
+        df = load_base_data(str(data_file), data_file.stat().st_mtime, tuple(DASHBOARD_COLS), LOADER_VERSION)
+        # Client flags change at runtime, so they are attached on top of the persisted frame
+        df[IS_CLIENT_COL] = df[ID_COL].isin(load_clients())
+        return df
     except Exception as e:
         st.error(f"❌ Error loading dataset: {e}")
         st.stop()
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def apply_filters(clients_version, province, levels, size, denomination, _df):
+    """Rows matching the sidebar filters, cached per widget state.
+    _df is not hashed; clients_version identifies which load_data frame it is.
+    """
+    # One boolean mask, then a single selection
+    mask = np.ones(len(_df), dtype=bool)
+    
+    if province != 'All':
+        mask &= (_df['province'] == province).to_numpy()
+    
+    if levels:
+        mask &= np.logical_or.reduce([_df[level].to_numpy(dtype=bool) for level in levels])
+    
+    if size != 'All':
+        mask &= (_df['school_size_category'] == size).to_numpy()
+    
+    if denomination != 'All':
+        mask &= (_df['denomination'] == denomination).to_numpy()
+    
+    return _df[mask]
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_map(signature, _map_data, only_clients):
+    """Build the Folium map once per filter signature.
+    _map_data is not hashed; signature must identify its contents.
+    """
+    from lib.maps import build_map
+    return build_map(_map_data, only_clients=only_clients)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def comprehensive_stats_for(filter_key, _filtered_df):
+    """Schools and mean enrollment per number of levels offered, cached per filter_key"""
+    stats = _filtered_df.groupby('level_count').agg({
+        'school_name': 'count',
+        'enrollment_total': 'mean'
+    }).round(0)
+    stats.columns = ['Number of Schools', 'Average Enrollment']
+    stats.index.name = 'Education Levels Offered'
+    return stats
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_overview(filter_key, _filtered_df):
+    """Counts behind the Overview, Geographic and Contact tabs, cached per filter_key.
+    One grouped pass over _filtered_df; every chart is a cheap projection of it.
+    """
+    keys = ['province', 'city', 'school_size_category', 'education_structure']
+    grouped = _filtered_df.assign(
+        has_phone=_filtered_df['phone_formatted'].notna()
+    ).groupby(keys, observed=True, dropna=False).agg(
+        schools=('school_name', 'size'),
+        websites=('has_website', 'sum'),
+        phones=('has_phone', 'sum'),
+    ).astype('int64')
+    
+    def counts(level):
+        # Same shape as value_counts(): missing keys dropped, largest first
+        return grouped['schools'].groupby(level=level, observed=True).sum().sort_values(ascending=False, kind='stable')
+    
+    by_province = grouped.groupby(level='province', observed=True).sum()
+    digital_stats = by_province[['websites', 'phones']].div(by_province['schools'], axis=0).round(3) * 100
+    digital_stats.columns = ['Website %', 'Phone %']
+    
+    return {
+        'province_counts': counts('province'),
+        'size_counts': counts('school_size_category'),
+        'structure_counts': counts('education_structure'),
+        'city_counts': counts('city'),
+        'digital_stats': digital_stats,
+        'contact_totals': grouped[['phones', 'websites']].sum(),
+    }
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def municipal_counts(filter_key, _filtered_df):
+    """Schools, students and mean school location per municipality, cached per filter_key"""
+    return _filtered_df.groupby(MUNICIPALITY_COL, observed=True).agg(
+        schools=(NAME_COL, 'count'),
+        students=('enrollment_total', 'sum'),
+        lat=(LAT_COL, 'mean'),
+        lon=(LON_COL, 'mean'),
+    ).dropna(subset=['lat', 'lon'])
+
+def municipality_map(muni):
+    """Bubble map with one marker per municipality, sized by school count"""
+    schools = muni['schools'].to_numpy(dtype=float)
+    fig = go.Figure(go.Scattermap(
+        lat=muni['lat'].to_numpy(dtype=float),
+        lon=muni['lon'].to_numpy(dtype=float),
+        mode='markers',
+        marker=dict(size=6 + 4 * np.sqrt(schools), color=schools, colorscale='Blues', opacity=0.8),
+        text=muni.index.astype(str),
+        customdata=np.column_stack([schools, muni['students'].to_numpy(dtype=float)]),
+        hovertemplate="<b>%{text}</b><br>%{customdata[0]:.0f} schools<br>%{customdata[1]:,.0f} students<extra></extra>",
+    ))
+    fig.update_layout(
+        map=dict(style='carto-positron', center=dict(lat=NL_CENTER[0], lon=NL_CENTER[1]), zoom=DEFAULT_ZOOM - 0.5),
+        height=550,
+        margin=dict(l=0, r=0, t=0, b=0),
+    )
+    return fig
+
+def education_level_table(filtered_df):
+    """Schools offering each relevant education level, with their share of filtered_df"""
+    education_data = []
+    for level in ['VMBO', 'HAVO', 'VWO']:
+        if level in filtered_df.columns:
+            count = filtered_df[level].sum()
+            percentage = (count / len(filtered_df)) * 100 if len(filtered_df) else 0
+            education_data.append({'Level': level, 'Schools': count, 'Percentage': f"{percentage:.1f}%"})
+    return pd.DataFrame(education_data)
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def build_figures(filter_key, _filtered_df):
+    """Plotly figures for the tabs, built once per filter_key.
+    cache_resource hands back the same objects instead of unpickling copies;
+    st.plotly_chart only reads them, so sharing them across sessions is safe.
+    """
+    overview = build_overview(filter_key, _filtered_df)
+    figures = {}
+    
+    province_counts = overview['province_counts']
+    figures['province'] = go.Figure(go.Bar(
+        x=province_counts.to_numpy(),
+        y=province_counts.index.astype(str),
+        orientation='h'
+    ))
+    figures['province'].update_layout(
+        title="Schools by Province", height=400,
+        xaxis_title='Number of Schools', yaxis_title='Province'
+    )
+    
+    size_counts = overview['size_counts']
+    figures['size'] = go.Figure(go.Pie(
+        values=size_counts.to_numpy(),
+        labels=size_counts.index.astype(str)
+    ))
+    figures['size'].update_layout(title="School Size Distribution")
+    
+    structure_counts = overview['structure_counts'].head(10)
+    figures['structure'] = go.Figure(go.Bar(
+        x=structure_counts.index.astype(str),
+        y=structure_counts.to_numpy()
+    ))
+    figures['structure'].update_layout(
+        title="Top 10 Education Structures",
+        xaxis_title='Education Structure', yaxis_title='Number of Schools'
+    )
+    figures['structure'].update_xaxes(tickangle=45)
+    
+    city_counts = overview['city_counts'].head(10)
+    figures['cities'] = go.Figure(go.Bar(
+        x=city_counts.to_numpy(),
+        y=city_counts.index.astype(str),
+        orientation='h'
+    ))
+    figures['cities'].update_layout(title="Schools by City (Top 10)", height=400)
+    
+    education_df = education_level_table(_filtered_df)
+    figures['education'] = go.Figure(go.Bar(
+        x=education_df['Level'],
+        y=education_df['Schools'],
+        marker=dict(color=education_df['Schools'], colorscale='Viridis', colorbar=dict(title='Schools'))
+    ))
+    figures['education'].update_layout(
+        title="Schools Offering Each Education Level", xaxis_title='Level', yaxis_title='Schools'
+    )
+    
+    totals = overview['contact_totals']
+    n_schools = len(_filtered_df)
+    contact_pct = [(totals['phones'] / n_schools) * 100, (totals['websites'] / n_schools) * 100] if n_schools else [0, 0]
+    figures['contact'] = go.Figure(go.Bar(
+        x=['Phone Numbers', 'Websites'],
+        y=contact_pct,
+        marker=dict(color=contact_pct, colorscale='Blues', colorbar=dict(title='Percentage'))
+    ))
+    figures['contact'].update_layout(
+        title="Contact Information Availability", xaxis_title='Contact Type', yaxis_title='Percentage'
+    )
+    return figures
+
 def main():
 
     # Header
@@ -94,21 +305,24 @@ def main():
 
     # Show GitHub sync status (concise)
     try:
-        from lib.data import has_github_token, github_clients_count
+        from lib.data import has_github_token, github_clients_count, github_save_status
         if has_github_token():
             cnt = github_clients_count()
-            last = st.session_state.get("github_save_time")
+            status = github_save_status()
+            last = status.get("time")
             note = f"GitHub sync ✓{'' if cnt is None else f' ({cnt})'}"
             if last:
                 note += f" • {last[:19]}Z"
+            if status["pending"]:
+                note += " • saving…"
             st.sidebar.caption(note)
         else:
             st.sidebar.caption("Clients stored locally")
     except Exception:
         pass
 
-    # Province filter
-    provinces = ['All'] + sorted(df['province'].dropna().unique().tolist())
+    # Province filter (option lists come from the already-sorted categorical categories)
+    provinces = ['All'] + list(df['province'].cat.categories)
     selected_province = st.sidebar.selectbox("📍 Select Province", provinces)
 
     # Education level filter (only relevant levels)
@@ -119,48 +333,49 @@ def main():
     )
 
     # School size filter
-    size_categories = ['All'] + sorted(df['school_size_category'].dropna().unique().tolist())
+    size_categories = ['All'] + list(df['school_size_category'].cat.categories)
     selected_size = st.sidebar.selectbox("📊 School Size", size_categories)
 
     # Denomination filter
-    denominations = ['All'] + sorted(df['denomination'].dropna().unique().tolist())
+    denominations = ['All'] + list(df['denomination'].cat.categories)
     selected_denomination = st.sidebar.selectbox("⛪ Denomination", denominations)
     
-    # Apply filters
-    filtered_df = df.copy()
-    
-    if selected_province != 'All':
-        filtered_df = filtered_df[filtered_df['province'] == selected_province]
-    
-    if education_levels:
-        mask = filtered_df[education_levels].any(axis=1)
-        filtered_df = filtered_df[mask]
-    
-    if selected_size != 'All':
-        filtered_df = filtered_df[filtered_df['school_size_category'] == selected_size]
-    
-    if selected_denomination != 'All':
-        filtered_df = filtered_df[filtered_df['denomination'] == selected_denomination]
+    # Apply filters (cached per widget state)
+    levels_key = tuple(sorted(education_levels))
+    filtered_df = apply_filters(
+        clients_version, selected_province, levels_key, selected_size, selected_denomination, df
+    )
+    # Cache key for aggregations over filtered_df
+    filter_key = (selected_province, levels_key, selected_size, selected_denomination)
     
     # Main dashboard
+    # Headline metrics from one pass over the two arrays they need
+    n_schools = len(filtered_df)
+    enrollment = filtered_df['enrollment_total'].to_numpy(dtype=float, na_value=np.nan)
+    enrollment = enrollment[~np.isnan(enrollment)]
+    total_students = enrollment.sum()
+    avg_size = enrollment.mean() if enrollment.size else np.nan
+    with_websites = filtered_df['has_website'].to_numpy(dtype=bool, na_value=False).sum()
+    website_pct = (with_websites / n_schools) * 100 if n_schools > 0 else 0
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("🏫 Total Schools", f"{len(filtered_df):,}")
+        st.metric("🏫 Total Schools", f"{n_schools:,}")
     
     with col2:
-        total_students = filtered_df['enrollment_total'].sum()
-        st.metric("👥 Total Students", f"{total_students:,.0f}" if pd.notna(total_students) else "N/A")
+        st.metric("👥 Total Students", f"{total_students:,.0f}")
     
     with col3:
-        avg_size = filtered_df['enrollment_total'].mean()
         st.metric("📊 Avg School Size", f"{avg_size:,.0f}" if pd.notna(avg_size) else "N/A")
     
     with col4:
-        with_websites = filtered_df['has_website'].sum()
-        website_pct = (with_websites / len(filtered_df)) * 100 if len(filtered_df) > 0 else 0
         st.metric("🌐 With Websites", f"{website_pct:.1f}%")
     
+    # Aggregates and charts shared by the tabs below
+    overview = build_overview(filter_key, filtered_df)
+    figures = build_figures(filter_key, filtered_df)
+    
     # Tabs for different views
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Overview", "🗺️ Geographic", "🎓 Education", "📞 Contact", "🔍 School Finder"])
     
@@ -171,101 +386,76 @@ def main():
         
         with col1:
             # Province distribution
-            province_counts = filtered_df['province'].value_counts()
-            fig_province = px.bar(
-                x=province_counts.values.tolist(),
-                y=province_counts.index.tolist(),
-                orientation='h',
-                title="Schools by Province",
-                labels={'x': 'Number of Schools', 'y': 'Province'}
-            )
-            fig_province.update_layout(height=400)
-            st.plotly_chart(fig_province, width='stretch')
+            st.plotly_chart(figures['province'], width='stretch')
 
         with col2:
             # School size distribution
-            size_counts = filtered_df['school_size_category'].value_counts()
-            fig_size = px.pie(
-                values=size_counts.values,
-                names=size_counts.index,
-                title="School Size Distribution"
-            )
-            st.plotly_chart(fig_size, width='stretch')
+            st.plotly_chart(figures['size'], width='stretch')
 
         # Education structure breakdown
         st.subheader("🎓 Education Structure Analysis")
-        structure_counts = filtered_df['education_structure'].value_counts().head(10)
-        fig_structure = px.bar(
-            x=structure_counts.index,
-            y=structure_counts.values,
-            title="Top 10 Education Structures",
-            labels={'x': 'Education Structure', 'y': 'Number of Schools'}
-        )
-        fig_structure.update_xaxes(tickangle=45)
-        st.plotly_chart(fig_structure, width='stretch')
+        st.plotly_chart(figures['structure'], width='stretch')
     
     with tab2:
         st.header("🗺️ Geographic Analysis")
 
-        # Lightweight map inline
-        try:
-            # Filters in this tab
-            colf1, colf2, colf3 = st.columns(3)
-            with colf1:
-                only_clients = st.toggle("Show only clients", value=False, key="map_only_clients")
-            with colf2:
-                provinces = ['All'] + (sorted(filtered_df['province'].dropna().unique().tolist()) if 'province' in filtered_df.columns else [])
-                province_map = st.selectbox("Province", options=provinces, index=0, key="map_province")
-            with colf3:
-                search_map = st.text_input("Search (name or city)", key="map_search")
-
-            map_data = filtered_df.copy()
-            if province_map != 'All' and 'province' in map_data.columns:
-                map_data = map_data[map_data['province'] == province_map]
-            if search_map:
-                mask = (
-                    map_data['school_name'].str.contains(search_map, case=False, na=False)
-                    | map_data['city'].str.contains(search_map, case=False, na=False)
-                )
-                map_data = map_data[mask]
-            if only_clients and IS_CLIENT_COL in map_data.columns:
-                map_data = map_data[map_data[IS_CLIENT_COL] == True]
-
-            # Build and render
-            m = build_map(map_data, only_clients=only_clients)
-            if m is None:
-                st.info("No data to display on the map.")
-            else:
-                st_folium(m, height=600)
-        except Exception as e:
-            st.warning(f"Map unavailable: {e}")
+        # Lightweight map: one aggregated marker per municipality instead of one per school
+        st.subheader("🏘️ Schools per Municipality")
+        min_schools = st.slider("Minimum schools per municipality", 1, 10, 1, key="muni_min_schools")
+        muni = municipal_counts(filter_key, filtered_df)
+        muni = muni[muni['schools'] >= min_schools]
+        if muni.empty:
+            st.info("No municipalities match the current filters.")
+        else:
+            st.plotly_chart(municipality_map(muni), width='stretch')
+
+        # Individual schools, opt-in so folium stays out of cold starts
+        if st.toggle("Show individual schools", value=False, key="map_show"):
+            try:
+                # Folium is only imported once someone asks for the map
+                from streamlit_folium import st_folium
+
+                # Filters in this tab
+                colf1, colf2, colf3 = st.columns(3)
+                with colf1:
+                    only_clients = st.toggle("Show only clients", value=False, key="map_only_clients")
+                with colf2:
+                    provinces = ['All'] + (sorted(filtered_df['province'].dropna().unique().tolist()) if 'province' in filtered_df.columns else [])
+                    province_map = st.selectbox("Province", options=provinces, index=0, key="map_province")
+                with colf3:
+                    search_map = st.text_input("Search (name or city)", key="map_search")
+
+                # One boolean mask over filtered_df, then a single selection
+                mask = np.ones(len(filtered_df), dtype=bool)
+                if province_map != 'All' and 'province' in filtered_df.columns:
+                    mask &= (filtered_df['province'] == province_map).to_numpy()
+                if search_map:
+                    mask &= search_mask(filtered_df, search_map).to_numpy(dtype=bool)
+                if only_clients and IS_CLIENT_COL in filtered_df.columns:
+                    mask &= filtered_df[IS_CLIENT_COL].to_numpy(dtype=bool)
+                map_data = filtered_df[mask]
+
+                # Build (or reuse) and render
+                signature = (clients_version, *filter_key, province_map, search_map, only_clients)
+                m = cached_map(signature, map_data, only_clients)
+                if m is None:
+                    st.info("No data to display on the map.")
+                else:
+                    st_folium(m, height=600)
+            except Exception as e:
+                st.warning(f"Map unavailable: {e}")
 
         st.divider()
 
         # Municipality analysis
         st.subheader("🏛️ Top Cities by School Count")
-        city_counts = filtered_df['city'].value_counts().head(10)
-        fig_cities = px.bar(
-            x=city_counts.values,
-            y=city_counts.index,
-            orientation='h',
-            title="Schools by City (Top 10)"
-        )
-        fig_cities.update_layout(height=400)
-        st.plotly_chart(fig_cities, width='stretch')
+        st.plotly_chart(figures['cities'], width='stretch')
     
     with tab3:
         st.header("🎓 Education Level Analysis")
         
         # Education level breakdown (relevant levels only)
-        education_data = []
-        for level in ['VMBO', 'HAVO', 'VWO']:
-            if level in filtered_df.columns:
-                count = filtered_df[level].sum()
-                percentage = (count / len(filtered_df)) * 100 if len(filtered_df) else 0
-                education_data.append({'Level': level, 'Schools': count, 'Percentage': f"{percentage:.1f}%"})
-
-        education_df = pd.DataFrame(education_data)
+        education_df = education_level_table(filtered_df)
         
         col1, col2 = st.columns(2)
 
@@ -274,27 +464,11 @@ def main():
             st.dataframe(education_df, width='stretch')
         
         with col2:
-            fig_education = px.bar(
-                education_df,
-                x='Level',
-                y='Schools',
-                title="Schools Offering Each Education Level",
-                color='Schools',
-                color_continuous_scale='viridis'
-            )
-            st.plotly_chart(fig_education, width='stretch')
+            st.plotly_chart(figures['education'], width='stretch')
         
         # Comprehensive schools analysis
         st.subheader("🎯 Comprehensive Schools Analysis")
-        relevant_cols = [c for c in ['VMBO', 'HAVO', 'VWO'] if c in filtered_df.columns]
-        filtered_df['level_count'] = filtered_df[relevant_cols].sum(axis=1) if relevant_cols else 0
-        comprehensive_stats = filtered_df.groupby('level_count').agg({
-            'school_name': 'count',
-            'enrollment_total': 'mean'
-        }).round(0)
-        comprehensive_stats.columns = ['Number of Schools', 'Average Enrollment']
-        comprehensive_stats.index.name = 'Education Levels Offered'
-        st.dataframe(comprehensive_stats)
+        st.dataframe(comprehensive_stats_for(filter_key, filtered_df))
     
     with tab4:
         st.header("📞 Contact Information Analysis")
@@ -304,37 +478,11 @@ def main():
         with col1:
             # Digital presence by province
             st.subheader("🌐 Digital Presence by Province")
-            digital_stats = filtered_df.groupby('province').agg({
-                'has_website': 'mean',
-                'phone_formatted': lambda x: x.notna().mean()
-            }).round(3) * 100
-            digital_stats.columns = ['Website %', 'Phone %']
-            st.dataframe(digital_stats)
+            st.dataframe(overview['digital_stats'])
         
         with col2:
             # Contact availability
-            contact_data = {
-                'Contact Type': ['Phone Numbers', 'Websites'],
-                'Available': [
-                    filtered_df['phone_formatted'].notna().sum(),
-                    filtered_df['has_website'].sum()
-                ],
-                'Percentage': [
-                    (filtered_df['phone_formatted'].notna().sum() / len(filtered_df)) * 100,
-                    (filtered_df['has_website'].sum() / len(filtered_df)) * 100
-                ]
-            }
-            contact_df = pd.DataFrame(contact_data)
-            
-            fig_contact = px.bar(
-                contact_df,
-                x='Contact Type',
-                y='Percentage',
-                title="Contact Information Availability",
-                color='Percentage',
-                color_continuous_scale='blues'
-            )
-            st.plotly_chart(fig_contact, width='stretch')
+            st.plotly_chart(figures['contact'], width='stretch')
     
     with tab5:
         st.header("🔍 School Finder & Clients")
@@ -343,10 +491,7 @@ def main():
         search_term = st.text_input("🔍 Search schools by name or city:")
 
         if search_term:
-            search_results = filtered_df[
-                filtered_df['school_name'].str.contains(search_term, case=False, na=False) |
-                filtered_df['city'].str.contains(search_term, case=False, na=False)
-            ]
+            search_results = filtered_df[search_mask(filtered_df, search_term)]
         else:
             search_results = filtered_df.head(50)  # Show first 50 schools by default
 
@@ -359,26 +504,30 @@ def main():
         ]
         available_cols = [c for c in display_columns if c in search_results.columns]
 
-        for _, row in search_results.reset_index(drop=True).iterrows():
-            school_id = str(row.get('vestigings_id', ''))
-            is_client = bool(row.get(IS_CLIENT_COL, False))
-            cols = st.columns([4, 2, 2, 2, 2])
-            with cols[0]:
-                st.write(f"{row.get('school_name', '')} — {row.get('city', '')}")
-            with cols[1]:
-                st.write(f"ID: {school_id}")
-            with cols[2]:
-                st.write("Client" if is_client else "Not client")
-            with cols[3]:
-                if not is_client and st.button("Mark as client", key=f"add-{school_id}"):
-                    toggle_client(filtered_df, school_id, True)
-                    st.session_state["clients_version"] = st.session_state.get("clients_version", 0) + 1
-                    st.rerun()
-            with cols[4]:
-                if is_client and st.button("Remove client", type="secondary", key=f"rm-{school_id}"):
-                    toggle_client(filtered_df, school_id, False)
-                    st.session_state["clients_version"] = st.session_state.get("clients_version", 0) + 1
-                    st.rerun()
+        # One editable table; the client checkbox is the only writable column
+        view = search_results[[NAME_COL, CITY_COL, ID_COL, IS_CLIENT_COL]].reset_index(drop=True)
+        edited = st.data_editor(
+            view,
+            column_config={
+                NAME_COL: st.column_config.Column("School"),
+                CITY_COL: st.column_config.Column("City"),
+                ID_COL: st.column_config.Column("ID"),
+                IS_CLIENT_COL: st.column_config.CheckboxColumn("Client"),
+            },
+            disabled=[NAME_COL, CITY_COL, ID_COL],
+            hide_index=True,
+            width='stretch',
+            key="client_editor",
+        )
+
+        changed = edited[IS_CLIENT_COL].to_numpy() != view[IS_CLIENT_COL].to_numpy()
+        if changed.any():
+            for school_id, make_client in zip(edited.loc[changed, ID_COL], edited.loc[changed, IS_CLIENT_COL]):
+                toggle_client(filtered_df, str(school_id), bool(make_client))
+            st.session_state["clients_version"] = st.session_state.get("clients_version", 0) + 1
+            # Edits are now in the data itself; drop them from the widget state
+            del st.session_state["client_editor"]
+            st.rerun()
 
         # Also show a compact table if desired
         with st.expander("Show compact table"):
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+📦 Convert the Schools Dataset to Parquet
+Writes a typed Parquet copy (categoricals + bool flags) that the dashboard loads instead of the CSV
+"""
+
+from lib.config import DATA_FILE_ACCURATE, DATA_FILE_ACCURATE_PARQUET
+from lib.data import write_parquet_copy
+
+def main():
+    print("📦 Converting dataset to Parquet")
+    print("=" * 40)
+    
+    write_parquet_copy(DATA_FILE_ACCURATE, DATA_FILE_ACCURATE_PARQUET)
+    
+    csv_kb = DATA_FILE_ACCURATE.stat().st_size / 1024
+    parquet_kb = DATA_FILE_ACCURATE_PARQUET.stat().st_size / 1024
+    print(f"💾 Saved to: {DATA_FILE_ACCURATE_PARQUET} ({parquet_kb:,.0f} KB vs {csv_kb:,.0f} KB CSV)")
+
+if __name__ == "__main__":
+    main()
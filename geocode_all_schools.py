@@ -4,81 +4,35 @@
 Geocodes all 1,620 schools with street-level precision
 """
 
+import asyncio
 import pandas as pd
-import requests
-import time
-import json
+import os
 from pathlib import Path
 from datetime import datetime
 
-def geocode_with_nominatim(address, cache):
-    """Geocode using Nominatim (OpenStreetMap) API"""
-    if address in cache:
-        return cache[address]
-    
-    try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': address,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'nl',
-            'addressdetails': 1
-        }
-        
-        headers = {
-            'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                result = (float(data[0]['lat']), float(data[0]['lon']))
-                cache[address] = result
-                return result
-        
-        cache[address] = None
-        return None
-        
-    except Exception as e:
-        print(f"Error geocoding {address}: {e}")
-        cache[address] = None
-        return None
+from lib.geocache import load_cache
+from lib.geocoding import (
+    GEOCODER_BACKENDS,
+    REQUEST_INTERVAL,
+    Geocoder,
+    apply_results,
+    build_full_addresses,
+    canonical_address_keys,
+    close_cache_on_exit,
+)
 
-def create_full_address(row):
-    """Create a full address string for geocoding"""
-    parts = []
-    
-    # Street and house number
-    if pd.notna(row['street']):
-        street_part = str(row['street']).strip()
-        if pd.notna(row['house_no']):
-            house_no = str(row['house_no']).strip()
-            if house_no != 'nan' and house_no != '':
-                street_part += f" {house_no}"
-                if pd.notna(row['house_add']):
-                    house_add = str(row['house_add']).strip()
-                    if house_add != 'nan' and house_add != '':
-                        street_part += house_add
-        parts.append(street_part)
-    
-    # Postcode and city
-    if pd.notna(row['postcode']):
-        parts.append(str(row['postcode']).strip())
-    
-    if pd.notna(row['city']):
-        parts.append(str(row['city']).strip())
-    
-    parts.append("Netherlands")
-    
-    return ", ".join(parts)
+# Geocoding backend: 'nominatim' (OpenStreetMap, rate limited) or 'pdok' (Dutch BAG Locatieserver)
+GEOCODER_BACKEND = os.environ.get('GEOCODER_BACKEND', 'nominatim').lower()
 
-def main():
+async def main_async(limit=None):
+    """Geocode every school still missing coordinates, or only those among the first `limit` rows"""
     print("🌍 Complete Accurate Geocoding for All Dutch Schools")
     print("=" * 60)
     
+    if GEOCODER_BACKEND not in GEOCODER_BACKENDS:
+        print(f"❌ Unknown GEOCODER_BACKEND '{GEOCODER_BACKEND}' (use one of {', '.join(GEOCODER_BACKENDS)})")
+        return
+    
     start_time = datetime.now()
     
     # Load dataset
@@ -86,38 +40,34 @@ def main():
     print(f"📊 Loaded {len(df):,} schools")
     
     # Load existing cache
-    cache_file = Path('accurate_geocoding_cache.json')
-    if cache_file.exists():
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
+    cache = load_cache()
+    if cache:
         print(f"📋 Loaded {len(cache)} cached coordinates")
-    else:
-        cache = {}
+    close_cache_on_exit(cache)
+    
+    # Add coordinate columns if they don't exist
+    if 'latitude' not in df.columns:
+        df['latitude'] = None
+    if 'longitude' not in df.columns:
+        df['longitude'] = None
     
     # Load existing progress if available
     progress_file = Path('nl_highschools_accurate_coordinates.csv')
     if progress_file.exists():
         df_existing = pd.read_csv(progress_file)
-        # Merge existing coordinates
-        for idx, row in df_existing.iterrows():
-            if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-                df.at[idx, 'latitude'] = row['latitude']
-                df.at[idx, 'longitude'] = row['longitude']
+        # Merge existing coordinates in one aligned update (rows match by index)
+        has_coords = df_existing['latitude'].notna() & df_existing['longitude'].notna()
+        df.update(df_existing.loc[has_coords, ['latitude', 'longitude']])
         print(f"📋 Loaded existing progress with coordinates")
-    else:
-        # Add coordinate columns if they don't exist
-        if 'latitude' not in df.columns:
-            df['latitude'] = None
-        if 'longitude' not in df.columns:
-            df['longitude'] = None
     
     # Create full addresses
-    df['full_address'] = df.apply(create_full_address, axis=1)
+    df['full_address'] = build_full_addresses(df)
     
-    # Count schools that need geocoding
-    needs_geocoding = df[(df['latitude'].isna()) | (df['longitude'].isna())]
+    # Count schools that need geocoding (optionally only among the first `limit` rows)
+    candidates = df.head(limit) if limit else df
+    needs_geocoding = candidates[(candidates['latitude'].isna()) | (candidates['longitude'].isna())]
     total_to_geocode = len(needs_geocoding)
-    already_geocoded = len(df) - total_to_geocode
+    already_geocoded = len(candidates) - total_to_geocode
     
     print(f"✅ Already geocoded: {already_geocoded:,} schools")
     print(f"🔍 Need to geocode: {total_to_geocode:,} schools")
@@ -126,56 +76,65 @@ def main():
         print("🎉 All schools already have coordinates!")
         return
     
+    # One request per distinct address; schools sharing it get the same coordinates
+    keys = canonical_address_keys(needs_geocoding['full_address'])
+    rows_per_key = keys.value_counts()
+    unique = needs_geocoding.assign(addr_key=keys).drop_duplicates('addr_key')
+    total_addresses = len(unique)
+    print(f"🔁 Unique addresses to look up: {total_addresses:,}")
+    
     # Estimate time
-    estimated_minutes = (total_to_geocode * 1.2) / 60  # 1.2 seconds per request
-    print(f"⏱️  Estimated time: {estimated_minutes:.1f} minutes")
+    if GEOCODER_BACKEND == 'pdok':
+        print("⚡ Using PDOK Locatieserver (no rate limit)")
+    else:
+        estimated_minutes = (total_addresses * REQUEST_INTERVAL) / 60  # bounded by the rate limiter
+        print(f"⏱️  Estimated time: {estimated_minutes:.1f} minutes")
     print(f"🚀 Starting geocoding at {start_time.strftime('%H:%M:%S')}")
     print("=" * 60)
     
     geocoded_count = 0
     failed_count = 0
-    
-    for idx, row in df.iterrows():
-        if pd.isna(row['latitude']) or pd.isna(row['longitude']):
-            address = row['full_address']
-            
-            coords = geocode_with_nominatim(address, cache)
+    done_count = 0
+    
+    # Lookups run concurrently; results are collected here and written to df in bulk
+    results = {}
+    meta = dict(zip(unique['full_address'], zip(unique['addr_key'], unique['school_name'])))
+    
+    async with Geocoder(cache, GEOCODER_BACKEND) as geocoder:
+        for next_done in geocoder.geocode_many(meta):
+            address, coords = await next_done
+            key, school_name = meta[address]
+            n_rows = rows_per_key[key]
+            done_count += 1
             
             if coords:
-                df.at[idx, 'latitude'] = coords[0]
-                df.at[idx, 'longitude'] = coords[1]
-                geocoded_count += 1
-                
-                # Progress indicator
-                if geocoded_count % 25 == 0:
-                    elapsed = datetime.now() - start_time
-                    remaining = total_to_geocode - geocoded_count
-                    eta_seconds = (elapsed.total_seconds() / geocoded_count) * remaining
-                    eta_minutes = eta_seconds / 60
-                    
-                    print(f"✅ {geocoded_count:4d}/{total_to_geocode} ({geocoded_count/total_to_geocode*100:5.1f}%) | "
-                          f"ETA: {eta_minutes:4.1f}m | "
-                          f"Latest: {row['school_name'][:40]:<40}")
-                
-                # Save progress every 50 schools
-                if geocoded_count % 50 == 0:
-                    df_output = df.drop('full_address', axis=1)
-                    df_output.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
-                    with open(cache_file, 'w') as f:
-                        json.dump(cache, f)
-                    print(f"💾 Progress saved at {geocoded_count} schools")
+                results[key] = coords
+                geocoded_count += n_rows
             else:
-                failed_count += 1
+                failed_count += n_rows
                 if failed_count <= 10:  # Only show first 10 failures
-                    print(f"❌ Failed: {row['school_name'][:50]} - {address}")
+                    print(f"❌ Failed: {school_name[:50]} - {address}")
             
-            # Rate limiting - be respectful to the API
-            time.sleep(1.2)
-    
-    # Save final results
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
-    
+            # Progress indicator
+            if done_count % 25 == 0:
+                elapsed = datetime.now() - start_time
+                remaining = total_addresses - done_count
+                eta_seconds = (elapsed.total_seconds() / done_count) * remaining
+                eta_minutes = eta_seconds / 60
+                
+                print(f"✅ {geocoded_count:4d}/{total_to_geocode} ({geocoded_count/total_to_geocode*100:5.1f}%) | "
+                      f"ETA: {eta_minutes:4.1f}m | "
+                      f"Latest: {school_name[:40]:<40}")
+            
+            # Save progress every 50 addresses
+            if done_count % 50 == 0:
+                apply_results(df, keys, results)
+                df_output = df.drop('full_address', axis=1)
+                df_output.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
+                print(f"💾 Progress saved at {geocoded_count} schools")
+    
+    # Save final results (the cache is flushed at exit)
+    apply_results(df, keys, results)
     df_output = df.drop('full_address', axis=1)
     df_output.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
     
@@ -206,5 +165,8 @@ def main():
     
     print("🎯 Ready for interactive mapping with accurate school locations!")
 
+def main(limit=None):
+    asyncio.run(main_async(limit))
+
 if __name__ == "__main__":
     main()
@@ -1,119 +1,129 @@
 #!/usr/bin/env python3
 """
 🎯 Enhanced Geocoding with Fallback for Failed Schools
-Uses exact addresses first, then falls back to city/postcode for failed schools
+Geocodes schools the main run missed by their postcode + city
 """
 
+import asyncio
+import os
+from typing import Protocol
+import aiohttp
+from aiolimiter import AsyncLimiter
 import pandas as pd
-import requests
-import time
-import json
+import orjson
 import numpy as np
-from pathlib import Path
+import requests
 
-def geocode_with_nominatim(address, cache):
-    """Geocode using Nominatim (OpenStreetMap) API"""
-    if address in cache:
-        return cache[address]
-    
-    try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': address,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'nl',
-            'addressdetails': 1
-        }
-        
-        headers = {
-            'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                result = (float(data[0]['lat']), float(data[0]['lon']))
-                cache[address] = result
-                return result
-        
-        cache[address] = None
-        return None
-        
-    except Exception as e:
-        print(f"Error geocoding {address}: {e}")
-        cache[address] = None
-        return None
+from lib.geocache import Coords, load_cache
+from lib.geocoding import NOMINATIM_URL, HEADERS, canonical_address_keys, retry_delay
 
-def geocode_fallback(postcode, city, cache):
-    """Fallback geocoding using just postcode and city"""
-    fallback_address = f"{postcode}, {city}, Netherlands"
-    
+# Nominatim usage policy: at most 1 request per second
+RATE_LIMIT = 1
+RATE_PERIOD = 1.0
+MAX_RETRIES = 3  # retries on throttling and server errors, with backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Batch provider, used instead of Nominatim when MAPBOX_ACCESS_TOKEN is set
+MAPBOX_BATCH_URL = "https://api.mapbox.com/search/geocode/v6/batch"
+MAPBOX_BATCH_SIZE = 1000  # queries per request (Mapbox limit)
+
+async def fetch_first_match(session, limiter, params):
+    """First Nominatim match for the query as (lat, lon), or None"""
+    for attempt in range(MAX_RETRIES + 1):
+        # Rate limiting - only the actual HTTP request takes a token
+        async with limiter:
+            async with session.get(NOMINATIM_URL, params=params) as response:
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    delay = retry_delay(response, attempt)
+                elif response.status == 200:
+                    data = await response.json(loads=orjson.loads)
+                    return (float(data[0]['lat']), float(data[0]['lon'])) if data else None
+                else:
+                    return None
+        await asyncio.sleep(delay)
+    return None
+
+async def geocode_fallback(session, limiter, fallback_address, cache):
+    """Fallback geocoding of a "postcode, city, Netherlands" address"""
     if fallback_address in cache:
         return cache[fallback_address]
     
     try:
-        url = "https://nominatim.openstreetmap.org/search"
         params = {
             'q': fallback_address,
             'format': 'json',
             'limit': 1,
             'countrycodes': 'nl'
         }
-        
-        headers = {
-            'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                # Add small random offset so schools don't overlap exactly
-                lat = float(data[0]['lat']) + np.random.uniform(-0.002, 0.002)
-                lon = float(data[0]['lon']) + np.random.uniform(-0.002, 0.002)
-                result = (lat, lon)
-                cache[fallback_address] = result
-                return result
-        
-        cache[fallback_address] = None
-        return None
+        result = await fetch_first_match(session, limiter, params)
         
     except Exception as e:
         print(f"Error in fallback geocoding {fallback_address}: {e}")
-        cache[fallback_address] = None
-        return None
+        result = None
+    
+    cache[fallback_address] = result
+    return result
+
+class BatchGeocoder(Protocol):
+    """A geocoding provider that resolves a list of addresses in one call"""
+    
+    def batch(self, addresses: list[str]) -> list[Coords]:
+        """Coordinates for each address, in input order (None where not found)"""
+        ...
 
-def create_full_address(row):
-    """Create a full address string for geocoding"""
-    parts = []
-    
-    # Street and house number
-    if pd.notna(row['street']):
-        street_part = str(row['street']).strip()
-        if pd.notna(row['house_no']):
-            house_no = str(row['house_no']).strip()
-            if house_no != 'nan' and house_no != '':
-                street_part += f" {house_no}"
-                if pd.notna(row['house_add']):
-                    house_add = str(row['house_add']).strip()
-                    if house_add != 'nan' and house_add != '':
-                        street_part += house_add
-        parts.append(street_part)
-    
-    # Postcode and city
-    if pd.notna(row['postcode']):
-        parts.append(str(row['postcode']).strip())
-    
-    if pd.notna(row['city']):
-        parts.append(str(row['city']).strip())
-    
-    parts.append("Netherlands")
-    
-    return ", ".join(parts)
+class NominatimGeocoder:
+    """Public Nominatim: one query per request, rate limited, over one keep-alive connection"""
+    
+    def __init__(self, cache):
+        self.cache = cache
+    
+    def batch(self, addresses):
+        return asyncio.run(self._batch(addresses))
+    
+    async def _batch(self, addresses):
+        limiter = AsyncLimiter(max_rate=RATE_LIMIT, time_period=RATE_PERIOD)
+        connector = aiohttp.TCPConnector(limit_per_host=1, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=15)
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(*[
+                geocode_fallback(session, limiter, address, self.cache) for address in addresses
+            ])
+
+class MapboxBatchGeocoder:
+    """Mapbox batch geocoding: up to MAPBOX_BATCH_SIZE queries per POST.
+    Requests permanent geocoding, since results are stored in the cache and the dataset.
+    """
+    
+    def __init__(self, cache, access_token):
+        self.cache = cache
+        self.access_token = access_token
+    
+    def batch(self, addresses):
+        todo = [address for address in dict.fromkeys(addresses) if address not in self.cache]
+        with requests.Session() as session:
+            for start in range(0, len(todo), MAPBOX_BATCH_SIZE):
+                chunk = todo[start:start + MAPBOX_BATCH_SIZE]
+                queries = [{'q': address, 'country': 'nl', 'limit': 1} for address in chunk]
+                try:
+                    response = session.post(
+                        MAPBOX_BATCH_URL, params={'access_token': self.access_token, 'permanent': 'true'},
+                        json=queries, timeout=60
+                    )
+                    response.raise_for_status()
+                except requests.RequestException as e:
+                    print(f"Error in batch geocoding ({len(chunk)} addresses): {e}")
+                    continue
+                for address, collection in zip(chunk, orjson.loads(response.content)['batch']):
+                    features = collection.get('features') or []
+                    # GeoJSON coordinates are [lon, lat]
+                    lon, lat = features[0]['geometry']['coordinates'] if features else (None, None)
+                    self.cache[address] = (float(lat), float(lon)) if features else None
+        return [self.cache.get(address) for address in addresses]
+
+def make_geocoder(cache) -> BatchGeocoder:
+    """Mapbox batch geocoding when MAPBOX_ACCESS_TOKEN is set, else public Nominatim"""
+    token = os.environ.get('MAPBOX_ACCESS_TOKEN')
+    return MapboxBatchGeocoder(cache, token) if token else NominatimGeocoder(cache)
 
 def process_failed_schools():
     """Process schools that failed in the main geocoding run"""
@@ -123,13 +133,8 @@ def process_failed_schools():
     # Load the current dataset
     df = pd.read_csv('nl_highschools_accurate_coordinates.csv')
     
-    # Load cache
-    cache_file = Path('accurate_geocoding_cache.json')
-    if cache_file.exists():
-        with open(cache_file, 'r') as f:
-            cache = json.load(f)
-    else:
-        cache = {}
+    # Load cache (SQLite; new entries are written in small batches as they arrive)
+    cache = load_cache()
     
     # Find schools without coordinates
     failed_schools = df[(df['latitude'].isna()) | (df['longitude'].isna())].copy()
@@ -137,34 +142,46 @@ def process_failed_schools():
     print(f"📊 Found {len(failed_schools)} schools without coordinates")
     print("🎯 Attempting fallback geocoding using postcode + city...")
     
-    fallback_success = 0
-    
-    for idx, row in failed_schools.iterrows():
-        postcode = str(row['postcode']).strip() if pd.notna(row['postcode']) else ''
-        city = str(row['city']).strip() if pd.notna(row['city']) else ''
-        
-        if postcode and city:
-            coords = geocode_fallback(postcode, city, cache)
-            
-            if coords:
-                df.at[idx, 'latitude'] = coords[0]
-                df.at[idx, 'longitude'] = coords[1]
-                fallback_success += 1
-                print(f"✅ Fallback: {row['school_name'][:50]:<50} | {coords[0]:.6f}, {coords[1]:.6f}")
-            else:
-                print(f"❌ Failed fallback: {row['school_name'][:50]}")
+    # Fallback lookups need both a postcode and a city
+    postcodes = failed_schools['postcode'].astype(str).str.strip().where(failed_schools['postcode'].notna(), '')
+    cities = failed_schools['city'].astype(str).str.strip().where(failed_schools['city'].notna(), '')
+    has_key = (postcodes != '') & (cities != '')
+    for school_name in failed_schools.loc[~has_key, 'school_name']:
+        print(f"❌ No postcode/city: {school_name[:50]}")
+    lookups = failed_schools[has_key]
+    
+    # Schools sharing a postcode/city share one lookup: geocode each key once, then fan out
+    addresses = postcodes[has_key] + ', ' + cities[has_key] + ', Netherlands'
+    keys = canonical_address_keys(addresses)
+    unique = addresses[~keys.duplicated()]
+    print(f"🔑 {len(unique)} unique postcode/city keys for {len(addresses)} schools")
+    try:
+        coords_by_key = dict(zip(keys[unique.index], make_geocoder(cache).batch(unique.tolist())))
+    finally:
+        cache.close()
+    results = [coords_by_key[key] for key in keys]
+    
+    # Collect successes, then write them back in one assignment per column
+    found = []
+    for idx, school_name, coords in zip(lookups.index, lookups['school_name'], results):
+        if coords:
+            # Add small random offset so schools don't overlap exactly
+            lat = coords[0] + np.random.uniform(-0.002, 0.002)
+            lon = coords[1] + np.random.uniform(-0.002, 0.002)
+            found.append((idx, lat, lon))
+            print(f"✅ Fallback: {school_name[:50]:<50} | {lat:.6f}, {lon:.6f}")
         else:
-            print(f"❌ No postcode/city: {row['school_name'][:50]}")
-        
-        time.sleep(1.0)  # Rate limiting
+            print(f"❌ Failed fallback: {school_name[:50]}")
+    
+    if found:
+        idxs, lats, lons = zip(*found)
+        df.loc[list(idxs), 'latitude'] = lats
+        df.loc[list(idxs), 'longitude'] = lons
+    fallback_success = len(found)
     
     # Save updated dataset
     df.to_csv('nl_highschools_accurate_coordinates.csv', index=False)
     
-    # Save cache
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
-    
     # Final statistics
     with_coords = df[(df['latitude'].notna()) & (df['longitude'].notna())]
     
@@ -5,12 +5,17 @@ from pathlib import Path
 
 # Data files (prefer accurate coordinates if present)
 DATA_FILE_ACCURATE = Path("nl_highschools_accurate_coordinates.csv")
+DATA_FILE_ACCURATE_PARQUET = DATA_FILE_ACCURATE.with_suffix(".parquet")  # binary copy, faster to load
 DATA_FILE_FALLBACK_WITH_COORDS = Path("nl_highschools_with_coordinates.csv")
 DATA_FILE_RAW = Path("nl_highschools_full.csv")
 
 # Client storage
 CLIENT_FILE = Path("client_schools.json")
 
+# Geocoding cache (SQLite; the JSON file is the legacy format it is seeded from)
+GEOCODE_CACHE_DB = Path("accurate_geocoding_cache.db")
+GEOCODE_CACHE_JSON = Path("accurate_geocoding_cache.json")
+
 # Map defaults
 NL_CENTER = (52.1326, 5.2913)  # Geographic center of the Netherlands
 DEFAULT_ZOOM = 7
@@ -22,6 +27,7 @@ LON_COL = "longitude"
 NAME_COL = "school_name"
 CITY_COL = "city"
 PROVINCE_COL = "province"
+MUNICIPALITY_COL = "municipality"
 WEBSITE_COL = "website"
 PHONE_COL = "phone_formatted"
 LEVELS_COL = "levels_offered"
@@ -29,10 +35,26 @@ LEVELS_COL = "levels_offered"
 # Derived column names
 IS_CLIENT_COL = "is_client"
 
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORY_COLS = [
+    "province", "city", "municipality", "denomination", "school_size_category", "education_structure", "vacation_region",
+]
+HAS_WEBSITE_COL = "has_website"
+
 # Education levels
 RELEVANT_LEVELS = ["VMBO", "HAVO", "VWO"]
 IRRELEVANT_LEVELS = ["PRO", "BRUGJAAR", "MAVO"]
 
+# Columns the main dashboard (app.py) reads; its loader drops the rest
+DASHBOARD_COLS = [
+    ID_COL, NAME_COL, CITY_COL, PROVINCE_COL, MUNICIPALITY_COL, "denomination", "school_size_category",
+    "education_structure", LEVELS_COL, "enrollment_total", PHONE_COL, WEBSITE_COL,
+    HAS_WEBSITE_COL, *RELEVANT_LEVELS, LAT_COL, LON_COL, IS_CLIENT_COL,
+]
+
+# Columns lib.data.load_schools reads from the Parquet dataset (everything app.py and pages/ use)
+LOADED_COLS = [c for c in DASHBOARD_COLS if c != IS_CLIENT_COL]
+
 
 
 # GitHub persistence defaults (used if a token is provided via env or Streamlit secrets)
@@ -6,28 +6,61 @@ from __future__ import annotations
 from pathlib import Path
 import json
 import os
+import re
 import base64
+import tempfile
+import threading
+import time
 from typing import Optional
 from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
 from lib.config import (
     DATA_FILE_ACCURATE,
+    DATA_FILE_ACCURATE_PARQUET,
     DATA_FILE_FALLBACK_WITH_COORDS,
     DATA_FILE_RAW,
     CLIENT_FILE,
     ID_COL,
+    NAME_COL,
+    CITY_COL,
+    LEVELS_COL,
+    WEBSITE_COL,
     LAT_COL,
     LON_COL,
     IS_CLIENT_COL,
     RELEVANT_LEVELS,
     IRRELEVANT_LEVELS,
+    CATEGORY_COLS,
+    LOADED_COLS,
+    HAS_WEBSITE_COL,
     GITHUB_OWNER,
     GITHUB_REPO,
     GITHUB_BRANCH,
     GITHUB_CLIENTS_PATH,
 )
 
+# Version of the frames load_schools() returns. Bump whenever loader output changes
+# (parsing, dtypes, cleaning, derived columns): app.py keys its disk-persisted cache on it.
+LOADER_VERSION = 1
+
+try:
+    import streamlit as st
+except ImportError:  # lib.data is also usable without Streamlit
+    st = None
+
+
+def _st_cache_data(**kwargs):
+    """st.cache_data(**kwargs) under Streamlit; without it, a pass-through with a no-op .clear()."""
+    def decorate(func):
+        if st is None:
+            func.clear = lambda: None
+            return func
+        return st.cache_data(**kwargs)(func)
+    return decorate
+
 
 def _get_github_token() -> Optional[str]:
     # Try Streamlit session (set via UI)
@@ -54,25 +87,51 @@ def _github_headers(token: str) -> dict:
     return {"Authorization": f"token {token}", "Accept": "application/vnd.github+json"}
 
 
-def github_clients_count() -> Optional[int]:
-    token = _get_github_token()
-    if not token:
-        return None
+# ETag and decoded body of the last clients file response, for conditional GETs
+_github_etag: dict = {}  # url -> (etag, decoded file)
+
+
+def _github_clients_file(token: str) -> Optional[str]:
+    """Decoded client_schools.json from GitHub, or None.
+    Revalidated with If-None-Match, so an unchanged file costs a bodyless 304.
+    """
     import requests
     url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{GITHUB_CLIENTS_PATH}?ref={GITHUB_BRANCH}"
-    r = requests.get(url, headers=_github_headers(token))
+    headers = _github_headers(token)
+    cached = _github_etag.get(url)
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    r = requests.get(url, headers=headers)
+    if r.status_code == 304 and cached:
+        return cached[1]
     if r.status_code == 200:
         content = r.json().get("content")
         if content:
             decoded = base64.b64decode(content).decode("utf-8")
-            try:
-                data = json.loads(decoded)
-                return len(data)
-            except Exception:
-                return 0
+            if r.headers.get("ETag"):
+                _github_etag[url] = (r.headers["ETag"], decoded)
+            return decoded
     return None
 
 
+# Memoized for a minute; save_clients() clears it after writes
+@_st_cache_data(ttl=60, show_spinner=False)
+def github_clients_count() -> Optional[int]:
+    token = _get_github_token()
+    if not token:
+        return None
+    decoded = _github_clients_file(token)
+    if decoded:
+        try:
+            data = json.loads(decoded)
+            return len(data)
+        except Exception:
+            return 0
+    return None
+
+
+# Memoized for a minute; save_clients() clears it after writes
+@_st_cache_data(ttl=60, show_spinner=False)
 def load_clients() -> set[str]:
     # Prefer local file for simplicity
     if Path(CLIENT_FILE).exists():
@@ -84,21 +143,83 @@ def load_clients() -> set[str]:
     # On Cloud: try GitHub
     token = _get_github_token()
     if token:
-        import requests
-        url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{GITHUB_CLIENTS_PATH}?ref={GITHUB_BRANCH}"
-        r = requests.get(url, headers=_github_headers(token))
-        if r.status_code == 200:
-            content = r.json().get("content")
-            if content:
-                decoded = base64.b64decode(content).decode("utf-8")
-                try:
-                    return set(json.loads(decoded))
-                except Exception:
-                    return set()
+        decoded = _github_clients_file(token)
+        if decoded:
+            try:
+                return set(json.loads(decoded))
+            except Exception:
+                return set()
     return set()
 
 
+# Client changes reach GitHub through a background push, at most once per interval;
+# edits made while one is waiting or in flight are batched into the next PUT
+GITHUB_PUSH_INTERVAL = 5.0  # seconds
+
+_push_lock = threading.Lock()
+_pending_push: Optional[tuple[str, list[str]]] = None  # (token, client IDs) not yet pushed
+_push_timer: Optional[threading.Timer] = None
+_last_push = 0.0
+_github_save: dict = {}  # outcome of the last push: {"ok": bool, "time": ISO timestamp}
+
+
+def _push_clients_to_github(token: str, client_ids: list[str]) -> bool:
+    import requests
+    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{GITHUB_CLIENTS_PATH}"
+
+    # Need current SHA if file exists
+    sha = None
+    r_get = requests.get(url, headers=_github_headers(token), params={"ref": GITHUB_BRANCH})
+    if r_get.status_code == 200:
+        sha = r_get.json().get("sha")
+
+    payload = {
+        "message": "chore(data): update client_schools.json via Streamlit app",
+        "content": base64.b64encode(json.dumps(client_ids).encode("utf-8")).decode("utf-8"),
+        "branch": GITHUB_BRANCH,
+    }
+    if sha:
+        payload["sha"] = sha
+
+    r_put = requests.put(url, headers=_github_headers(token), json=payload)
+    return r_put.status_code in (200, 201)
+
+
+def _schedule_github_push() -> None:
+    """Start the push timer unless one is pending; call with _push_lock held."""
+    global _push_timer
+    if _push_timer is None:
+        delay = max(0.0, _last_push + GITHUB_PUSH_INTERVAL - time.monotonic())
+        _push_timer = threading.Timer(delay, _flush_github_push)
+        _push_timer.start()
+
+
+def _flush_github_push() -> None:
+    global _pending_push, _push_timer, _last_push
+    with _push_lock:
+        pending, _pending_push = _pending_push, None
+    try:
+        ok = _push_clients_to_github(*pending)
+    except Exception:
+        ok = False
+    with _push_lock:
+        _last_push = time.monotonic()
+        _github_save.update(ok=ok, time=datetime.now(timezone.utc).isoformat())
+        _push_timer = None
+        # Changes saved during the push go out in the next one
+        if _pending_push is not None:
+            _schedule_github_push()
+    github_clients_count.clear()
+
+
+def github_save_status() -> dict:
+    """Last GitHub push ({"ok", "time"}, empty before the first) and whether one is still pending."""
+    with _push_lock:
+        return {**_github_save, "pending": _push_timer is not None}
+
+
 def save_clients(client_ids: set[str]) -> None:
+    global _pending_push
     # Save local (works locally and on Cloud ephemeral FS)
     try:
         with open(CLIENT_FILE, "w") as f:
@@ -106,50 +227,108 @@ def save_clients(client_ids: set[str]) -> None:
     except Exception:
         pass
 
-    # Also push to GitHub if token available (to persist across Cloud restarts)
+    # Also push to GitHub if token available (to persist across Cloud restarts), off the UI thread.
+    # The token is resolved here, since the push thread has no Streamlit session.
     token = _get_github_token()
-    ok = False
     if token:
-        import requests
-        url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents/{GITHUB_CLIENTS_PATH}"
-
-        # Need current SHA if file exists
-        sha = None
-        r_get = requests.get(url, headers=_github_headers(token), params={"ref": GITHUB_BRANCH})
-        if r_get.status_code == 200:
-            sha = r_get.json().get("sha")
-
-        payload = {
-            "message": "chore(data): update client_schools.json via Streamlit app",
-            "content": base64.b64encode(json.dumps(sorted(list(client_ids))).encode("utf-8")).decode("utf-8"),
-            "branch": GITHUB_BRANCH,
-        }
-        if sha:
-            payload["sha"] = sha
-
-        r_put = requests.put(url, headers=_github_headers(token), json=payload)
-        ok = r_put.status_code in (200, 201)
-
-    # Store status for UI if Streamlit is available
+        with _push_lock:
+            _pending_push = (token, sorted(client_ids))
+            _schedule_github_push()
+
+    # The client set just changed; drop memoized reads
+    load_clients.clear()
+    github_clients_count.clear()
+
+
+def write_parquet_copy(csv: Path, parquet: Path) -> None:
+    """Write the typed (categoricals + bool flags) Parquet copy of a dataset CSV.
+    Written to a temporary file and renamed into place, so readers never see a partial file.
+    """
+    df = optimize_dtypes(read_table(csv))
+    parquet = Path(parquet)
+    fd, tmp = tempfile.mkstemp(dir=parquet.parent, prefix=f".{parquet.name}.", suffix=".tmp")
+    os.close(fd)
     try:
-        import streamlit as st
-        st.session_state["github_save_ok"] = ok
-        st.session_state["github_save_time"] = datetime.now(timezone.utc).isoformat()
-    except Exception:
-        pass
+        df.to_parquet(tmp, engine="pyarrow", compression="snappy", index=False)
+        os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+        os.replace(tmp, parquet)
+    except BaseException:
+        os.unlink(tmp)
+        raise
 
 
 def resolve_data_file() -> Path:
-    # Prefer accurate coords, then fallback-with-coords, then raw
-    if Path(DATA_FILE_ACCURATE).exists():
-        return DATA_FILE_ACCURATE
+    # Prefer accurate coords (Parquet copy, refreshed when missing or older than the CSV), then fallback-with-coords, then raw
+    parquet, csv = Path(DATA_FILE_ACCURATE_PARQUET), Path(DATA_FILE_ACCURATE)
+    if csv.exists() and (not parquet.exists() or parquet.stat().st_mtime < csv.stat().st_mtime):
+        try:
+            write_parquet_copy(csv, parquet)
+        except Exception:
+            return DATA_FILE_ACCURATE  # e.g. read-only filesystem: keep reading the CSV
+    if parquet.exists():
+        return DATA_FILE_ACCURATE_PARQUET
     if Path(DATA_FILE_FALLBACK_WITH_COORDS).exists():
         return DATA_FILE_FALLBACK_WITH_COORDS
     return DATA_FILE_RAW
 
 
-def load_schools(with_client_flag: bool = True) -> pd.DataFrame:
-    df = pd.read_csv(resolve_data_file())
+# CSV column types: IDs and level lists as strings, repeated text as categoricals
+CSV_DTYPES = {ID_COL: "string", LEVELS_COL: "string", **{col: "category" for col in CATEGORY_COLS}}
+
+
+def read_table(path: Path, dtype_backend: Optional[str] = None, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """Read a dataset file, using the Parquet reader for .parquet files.
+    CSVs are parsed by PyArrow's multithreaded reader.
+    dtype_backend="pyarrow" returns Arrow-backed columns.
+    columns prunes a Parquet read to those fields (the ones the file has); CSVs are read whole.
+    """
+    kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+    if Path(path).suffix == ".parquet":
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, engine="pyarrow", columns=columns, **kwargs)
+    return pd.read_csv(path, engine="pyarrow", dtype=CSV_DTYPES, **kwargs)
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast low-cardinality text columns to category and flag columns to bool (in place).
+    Categories are limited to the values present, so option lists built from them match the rows.
+    """
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category").cat.remove_unused_categories()
+    for col in RELEVANT_LEVELS + IRRELEVANT_LEVELS + [HAS_WEBSITE_COL]:
+        if col in df.columns:
+            df[col] = df[col].fillna(False).astype(bool)
+    return df
+
+
+# Lowercased "name<US>city" search column (search_mask), added by the loader
+SEARCH_COL = "_search_blob"
+
+# Fully-qualified website URL (normalize_urls), added by the loader
+WEBSITE_NORM_COL = "_website_norm"
+
+# One irrelevant token between doubled commas (RE2-compatible, so Arrow strings stay in C++)
+_IRRELEVANT_TOKEN = ",(?:" + "|".join(re.escape(lvl) for lvl in IRRELEVANT_LEVELS) + "),"
+
+
+def _clean_levels(levels: pd.Series) -> pd.Series:
+    """Drop irrelevant levels from comma-separated level lists, normalized to ", " separators.
+
+    Every token is wrapped as ",TOKEN," (commas doubled) so adjacent irrelevant tokens
+    match independently; empty tokens collapse with the leftover commas.
+    """
+    wrapped = "," + levels.str.strip().str.replace(r"\s*,\s*", ",,", regex=True) + ","
+    kept = wrapped.str.replace(_IRRELEVANT_TOKEN, "", regex=True).str.replace(",{2,}", ",", regex=True)
+    return kept.str.strip(",").str.replace(",", ", ", regex=False)
+
+
+@_st_cache_data(show_spinner=False, max_entries=4)
+def _load_schools_cached(path: str, mtime: float, dtype_backend: Optional[str]) -> pd.DataFrame:
+    """Read, filter and clean the dataset; mtime is only a cache key, so an updated file is re-read."""
+    df = read_table(Path(path), dtype_backend=dtype_backend, columns=LOADED_COLS)
 
     # Ensure coordinate columns exist
     if LAT_COL not in df.columns:
@@ -160,8 +339,16 @@ def load_schools(with_client_flag: bool = True) -> pd.DataFrame:
     # Filter: keep schools that offer at least one relevant level (VMBO/HAVO/VWO)
     available_relevant = [lvl for lvl in RELEVANT_LEVELS if lvl in df.columns]
     if available_relevant:
-        mask = df[available_relevant].astype(bool).any(axis=1)
+        # OR the flag columns' buffers in place instead of materializing a bool DataFrame
+        flags = [df[lvl].to_numpy(dtype=bool, na_value=False) for lvl in available_relevant]
+        mask = flags[0].copy()
+        for flag in flags[1:]:
+            np.logical_or(mask, flag, out=mask)
         df = df[mask].copy()
+        # Categories come from the whole file; drop the ones only filtered-out rows used
+        for col in CATEGORY_COLS:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
 
     # Hide irrelevant level columns from downstream views
     drop_cols = [c for c in IRRELEVANT_LEVELS if c in df.columns]
@@ -170,18 +357,30 @@ def load_schools(with_client_flag: bool = True) -> pd.DataFrame:
 
     # Clean levels_offered for display (remove irrelevant tokens)
     if 'levels_offered' in df.columns:
-        def _clean_levels(s: object) -> object:
-            if isinstance(s, str):
-                parts = [p.strip() for p in s.split(',')]
-                parts = [p for p in parts if p and p not in IRRELEVANT_LEVELS]
-                return ', '.join(parts)
-            return s
-        df['levels_offered'] = df['levels_offered'].apply(_clean_levels)
-
-    # Attach client flag
+        df['levels_offered'] = _clean_levels(df['levels_offered'])
+
+    # Lowercased "name<US>city" column, so searches scan one column once without casefolding per query;
+    # Arrow-backed whatever the dtype backend, so str.contains(regex=False) runs Arrow's substring kernel
+    df[SEARCH_COL] = (
+        df[NAME_COL].astype("string[pyarrow]").fillna("") + "\x1f"
+        + df[CITY_COL].astype("string[pyarrow]").fillna("")
+    ).str.lower()
+
+    # Fully-qualified website URLs, so map popups don't normalize per marker
+    if WEBSITE_COL in df.columns:
+        df[WEBSITE_NORM_COL] = normalize_urls(df[WEBSITE_COL])
+
+    return df
+
+
+def load_schools(with_client_flag: bool = True, dtype_backend: Optional[str] = None) -> pd.DataFrame:
+    path = resolve_data_file()
+    df = _load_schools_cached(str(path), path.stat().st_mtime, dtype_backend)
+
+    # Attach client flag outside the cache, since clients change at runtime
     if with_client_flag:
         clients = load_clients()
-        df[IS_CLIENT_COL] = df[ID_COL].astype(str).isin(clients)
+        df[IS_CLIENT_COL] = df[ID_COL].isin(clients)
     return df
 
 
@@ -195,14 +394,19 @@ def toggle_client(df: pd.DataFrame, school_id: str, make_client: bool) -> set[st
     save_clients(clients)
     # also update in-memory df if present
     if IS_CLIENT_COL in df.columns:
-        df.loc[df[ID_COL].astype(str) == str(school_id), IS_CLIENT_COL] = make_client
+        df.loc[df[ID_COL] == str(school_id), IS_CLIENT_COL] = make_client
     return clients
 
 
+def search_mask(df: pd.DataFrame, search: str) -> pd.Series:
+    """Rows whose name or city contains search (case-insensitive), via the loader's search column"""
+    return df[SEARCH_COL].str.contains(search.lower(), regex=False, na=False)
+
+
 def normalize_url(value: object) -> Optional[str]:
     """Ensure website URL is fully-qualified (http/https). Returns None if empty/NaN."""
     try:
-        if value is None or (isinstance(value, float) and pd.isna(value)):
+        if value is None or value is pd.NA or (isinstance(value, float) and pd.isna(value)):
             return None
         s = str(value).strip()
         if not s or s.lower() == 'nan':
@@ -213,3 +417,9 @@ def normalize_url(value: object) -> Optional[str]:
     except Exception:
         return None
 
+
+def normalize_urls(values: pd.Series) -> pd.Series:
+    """Vectorized normalize_url over a column; <NA> where empty/NaN."""
+    s = values.astype("string").str.strip()
+    s = s.mask(s.str.lower().isin(["", "nan"]))
+    return s.where(s.str.startswith(("http://", "https://")), "https://" + s)
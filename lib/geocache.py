@@ -0,0 +1,59 @@
+"""
+Persistent address -> coordinates cache shared by the geocoding scripts.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+from typing import Optional
+
+import orjson
+
+from lib.config import GEOCODE_CACHE_DB, GEOCODE_CACHE_JSON
+
+Coords = Optional[tuple[float, float]]
+
+
+class GeocodeCache(dict):
+    """In-memory address -> (lat, lon) cache, appended to SQLite as entries are added.
+
+    The connection may be used from worker threads; callers serialize access.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 10):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS g(addr TEXT PRIMARY KEY, lat REAL, lon REAL)")
+        rows = self.conn.execute("SELECT addr, lat, lon FROM g")
+        super().__init__((addr, None if lat is None else (lat, lon)) for addr, lat, lon in rows)
+        self.batch_size = batch_size
+        self.pending: list[tuple[str, Optional[float], Optional[float]]] = []
+
+    def __setitem__(self, address: str, coords: Coords) -> None:
+        super().__setitem__(address, coords)
+        lat, lon = coords if coords else (None, None)
+        self.pending.append((address, lat, lon))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending entries in a single transaction"""
+        if self.pending:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO g VALUES (?, ?, ?)", self.pending)
+            self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+
+def load_cache(path: Path = GEOCODE_CACHE_DB, legacy_json: Path = GEOCODE_CACHE_JSON) -> GeocodeCache:
+    """Open the SQLite cache, importing the legacy JSON cache on first use"""
+    cache = GeocodeCache(path)
+    if not cache and Path(legacy_json).exists():
+        with open(legacy_json, "rb") as f:
+            for address, coords in orjson.loads(f.read()).items():
+                cache[address] = tuple(coords) if coords else None
+        cache.flush()
+    return cache
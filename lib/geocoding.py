@@ -0,0 +1,170 @@
+"""
+Geocoding client and address helpers shared by the geocoding scripts.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import signal
+import sys
+from typing import Iterable, Optional
+
+import httpx
+from aiolimiter import AsyncLimiter
+import orjson
+import pandas as pd
+
+from lib.geocache import Coords, GeocodeCache
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+PDOK_URL = "https://api.pdok.nl/bzk/locatieserver/search/v3_1/free"
+HEADERS = {"User-Agent": "nl-highschools-dashboard/1.0 (educational research)"}
+
+# Backends: 'nominatim' (OpenStreetMap, rate limited) or 'pdok' (Dutch BAG Locatieserver)
+GEOCODER_BACKENDS = ("nominatim", "pdok")
+
+# Nominatim: requests in flight at once; the rate limiter caps the aggregate rate
+MAX_CONCURRENT_REQUESTS = 8
+REQUEST_INTERVAL = 1.2  # seconds between requests (lower for self-hosted Nominatim)
+PDOK_CONCURRENT_REQUESTS = 16  # PDOK has no per-client rate limit, only concurrency is capped
+
+
+def retry_delay(response, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled request (Retry-After, else exponential backoff)"""
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return int(retry_after)
+    return 2 ** attempt
+
+
+class Geocoder:
+    """Async geocoding client: one HTTP/2 connection, a shared cache and the backend's limits.
+
+    Use as ``async with Geocoder(cache, backend) as geocoder``.
+    """
+
+    def __init__(self, cache: GeocodeCache, backend: str = "nominatim"):
+        if backend not in GEOCODER_BACKENDS:
+            raise ValueError(f"Unknown geocoder backend {backend!r} (use one of {GEOCODER_BACKENDS})")
+        self.cache = cache
+        self.backend = backend
+        self.sem = asyncio.Semaphore(PDOK_CONCURRENT_REQUESTS if backend == "pdok" else MAX_CONCURRENT_REQUESTS)
+        self.limiter = AsyncLimiter(max_rate=1, time_period=REQUEST_INTERVAL)
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "Geocoder":
+        self.client = httpx.AsyncClient(http2=True, headers=HEADERS, timeout=15.0)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.client.aclose()
+
+    async def geocode(self, address: str) -> Coords:
+        """Coordinates for one address, from the cache when possible"""
+        if self.backend == "pdok":
+            return await self._geocode_pdok(address)
+        return await self._geocode_nominatim(address)
+
+    def geocode_many(self, addresses: Iterable[str]):
+        """Awaitables yielding (address, coords), in completion order"""
+        async def one(address: str) -> tuple[str, Coords]:
+            return address, await self.geocode(address)
+        return asyncio.as_completed([one(address) for address in addresses])
+
+    async def _geocode_nominatim(self, address: str) -> Coords:
+        if address in self.cache:
+            return self.cache[address]
+
+        result = None
+        async with self.sem:
+            try:
+                params = {
+                    "q": address,
+                    "format": "json",
+                    "limit": 1,
+                    "countrycodes": "nl",
+                    "addressdetails": 1,
+                }
+                # Rate limiting - be respectful to the API
+                async with self.limiter:
+                    response = await self.client.get(NOMINATIM_URL, params=params)
+
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    if data:
+                        result = (float(data[0]["lat"]), float(data[0]["lon"]))
+            except Exception as e:
+                print(f"Error geocoding {address}: {e}")
+
+        self.cache[address] = result
+        return result
+
+    async def _geocode_pdok(self, address: str) -> Coords:
+        # A miss cached by another backend is worth retrying here
+        if self.cache.get(address) is not None:
+            return self.cache[address]
+
+        result = None
+        async with self.sem:
+            try:
+                params = {
+                    "q": address.removesuffix(", Netherlands"),
+                    "fq": "type:adres",
+                    "fl": "centroide_ll",
+                    "rows": 1,
+                }
+                response = await self.client.get(PDOK_URL, params=params)
+
+                if response.status_code == 200:
+                    docs = orjson.loads(response.content)["response"]["docs"]
+                    if docs:
+                        # WGS84 centroid as "POINT(lon lat)"
+                        lon, lat = docs[0]["centroide_ll"].removeprefix("POINT(").removesuffix(")").split()
+                        result = (float(lat), float(lon))
+            except Exception as e:
+                print(f"Error geocoding {address}: {e}")
+
+        self.cache[address] = result
+        return result
+
+
+def _clean(series: pd.Series) -> pd.Series:
+    """Stripped string values, NaN where the source value is missing"""
+    return series.astype(str).str.strip().where(series.notna())
+
+
+def build_full_addresses(df: pd.DataFrame) -> pd.Series:
+    """Create full address strings for geocoding, vectorized over the whole DataFrame"""
+    # Street and house number (addition only follows a house number)
+    house_no = _clean(df["house_no"])
+    house_no = house_no.where(~house_no.isin(["nan", ""]))
+    house_add = _clean(df["house_add"])
+    house_add = house_add.where(~house_add.isin(["nan", ""]))
+    street = _clean(df["street"]) + (" " + house_no + house_add.fillna("")).fillna("")
+
+    # Missing parts are skipped; always add Netherlands
+    return (
+        (street + ", ").fillna("")
+        + (_clean(df["postcode"]) + ", ").fillna("")
+        + (_clean(df["city"]) + ", ").fillna("")
+        + "Netherlands"
+    )
+
+
+def canonical_address_keys(addresses: pd.Series) -> pd.Series:
+    """Normalize addresses (case, whitespace) so trivially different strings share one key"""
+    return addresses.str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def apply_results(df: pd.DataFrame, keys: pd.Series, results: dict) -> None:
+    """Write geocoded coordinates onto every row whose address key has a result"""
+    coords = keys.map(results).dropna()
+    if len(coords):
+        df.loc[coords.index, ["latitude", "longitude"]] = coords.tolist()
+
+
+def close_cache_on_exit(cache: GeocodeCache) -> None:
+    """Flush the cache when the script exits, also on Ctrl-C or SIGTERM"""
+    atexit.register(cache.close)
+    # atexit does not run on an unhandled SIGTERM; turn it into a normal exit
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
@@ -3,8 +3,10 @@ Map building utilities with Folium for Streamlit.
 """
 from __future__ import annotations
 
+import html
+
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster
 from typing import Optional
 import pandas as pd
 
@@ -18,35 +20,38 @@ from lib.config import (
     WEBSITE_COL,
     IS_CLIENT_COL,
 )
-from lib.data import normalize_url
+from lib.data import WEBSITE_NORM_COL, normalize_urls
 
 CLIENT_COLOR = "#2ca02c"  # green
 NONCLIENT_COLOR = "#1f77b4"  # blue
 
 
-def add_school_marker(map_obj: folium.Map, row: pd.Series) -> None:
-    lat, lon = row.get(LAT_COL), row.get(LON_COL)
-    if pd.isna(lat) or pd.isna(lon):
-        return
-    is_client = bool(row.get(IS_CLIENT_COL, False))
-    color = CLIENT_COLOR if is_client else NONCLIENT_COLOR
-
-    site = normalize_url(row.get(WEBSITE_COL))
-    link = f'<a href="{site}" target="_blank">Website</a>' if site else ''
-    popup_html = f"""
-        <b>{row.get(NAME_COL, 'School')}</b><br/>
-        {row.get(CITY_COL, '')}<br/>
-        {link}
-    """
-    folium.CircleMarker(
-        location=(lat, lon),
-        radius=6 if is_client else 5,
-        color=color,
-        fill=True,
-        fill_color=color,
-        fill_opacity=0.8,
-        popup=folium.Popup(popup_html, max_width=300),
-    ).add_to(map_obj)
+# Client-side marker factory for FastMarkerCluster; rows are [lat, lon, is_client, name, city, site]
+_MARKER_CALLBACK = """function (row) {
+    var color = row[2] ? '%s' : '%s';
+    var marker = L.circleMarker([row[0], row[1]], {
+        radius: row[2] ? 6 : 5, color: color, fill: true, fillColor: color, fillOpacity: 0.8
+    });
+    var link = row[5] ? '<a href="' + row[5] + '" target="_blank">Website</a>' : '';
+    marker.bindPopup('<b>' + row[3] + '</b><br/>' + row[4] + '<br/>' + link, {maxWidth: 300});
+    return marker;
+}""" % (CLIENT_COLOR, NONCLIENT_COLOR)
+
+
+def _column(df: pd.DataFrame, col: str, default: object) -> pd.Series:
+    return df[col] if col in df.columns else pd.Series(default, index=df.index)
+
+
+def _escaped(values: pd.Series) -> list[str]:
+    # Cast first: city/province may be categoricals, which reject a new "" fill value
+    return values.astype("string").fillna("").map(html.escape).tolist()
+
+
+def _websites(df: pd.DataFrame) -> pd.Series:
+    # Precomputed by lib.data's loader; frames without it are normalized here in one pass
+    if WEBSITE_NORM_COL in df.columns:
+        return df[WEBSITE_NORM_COL]
+    return normalize_urls(_column(df, WEBSITE_COL, None))
 
 
 def build_map(df: pd.DataFrame, only_clients: bool = False) -> Optional[folium.Map]:
@@ -54,15 +59,22 @@ def build_map(df: pd.DataFrame, only_clients: bool = False) -> Optional[folium.M
         return None
     m = folium.Map(location=NL_CENTER, zoom_start=DEFAULT_ZOOM, tiles="CartoDB positron")
 
-    cluster = MarkerCluster().add_to(m)
-    data = df.copy()
-    if only_clients and IS_CLIENT_COL in data.columns:
-        data = data[data[IS_CLIENT_COL] == True]
+    # Rows with coordinates (and only clients if requested), selected with one mask
+    mask = (df[LAT_COL].notna() & df[LON_COL].notna()).to_numpy(dtype=bool)
+    is_client = _column(df, IS_CLIENT_COL, False).fillna(False).to_numpy(dtype=bool)
+    if only_clients and IS_CLIENT_COL in df.columns:
+        mask &= is_client
+    data = df[mask]
 
-    for _, row in data.iterrows():
-        lat, lon = row.get(LAT_COL), row.get(LON_COL)
-        if pd.notna(lat) and pd.notna(lon):
-            add_school_marker(cluster, row)
+    # All markers go to the browser as one JSON array; Leaflet builds them client-side
+    rows = zip(
+        data[LAT_COL].to_numpy(dtype=float).tolist(),
+        data[LON_COL].to_numpy(dtype=float).tolist(),
+        is_client[mask].astype(int).tolist(),
+        _escaped(_column(data, NAME_COL, "School")),
+        _escaped(_column(data, CITY_COL, "")),
+        _escaped(_websites(data)),
+    )
+    FastMarkerCluster(data=[list(row) for row in rows], callback=_MARKER_CALLBACK).add_to(m)
 
     return m
-
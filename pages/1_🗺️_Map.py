@@ -2,9 +2,9 @@ import streamlit as st
 from streamlit_folium import st_folium
 import pandas as pd
 
-from lib.data import load_schools, resolve_data_file
+from lib.data import load_schools, resolve_data_file, search_mask
 from lib.maps import build_map
-from lib.config import IS_CLIENT_COL, NAME_COL, CITY_COL, PROVINCE_COL
+from lib.config import IS_CLIENT_COL, PROVINCE_COL
 
 st.set_page_config(page_title="Map | Examify Schools", page_icon="🗺️", layout="wide")
 
@@ -28,18 +28,15 @@ with colf2:
 with colf3:
     search = st.text_input("Search (name or city)")
 
-# Filter
-data = df.copy()
-if province != "All" and PROVINCE_COL in data.columns:
-    data = data[data[PROVINCE_COL] == province]
+# Filter: compose one boolean mask and select once (build_map only reads the frame)
+mask = pd.Series(True, index=df.index)
+if province != "All" and PROVINCE_COL in df.columns:
+    mask &= df[PROVINCE_COL] == province
 if search:
-    mask = (
-        data[NAME_COL].str.contains(search, case=False, na=False)
-        | data[CITY_COL].str.contains(search, case=False, na=False)
-    )
-    data = data[mask]
-if only_clients and IS_CLIENT_COL in data.columns:
-    data = data[data[IS_CLIENT_COL] == True]
+    mask &= search_mask(df, search)
+if only_clients and IS_CLIENT_COL in df.columns:
+    mask &= df[IS_CLIENT_COL].fillna(False).astype(bool)
+data = df.loc[mask]
 
 # Map
 m = build_map(data, only_clients=only_clients)
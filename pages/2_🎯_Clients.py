@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 
-from lib.data import load_schools, toggle_client
+from lib.data import load_schools, search_mask, toggle_client
 from lib.config import ID_COL, NAME_COL, CITY_COL, IS_CLIENT_COL
 
 st.set_page_config(page_title="Clients | Examify Schools", page_icon="🎯", layout="wide")
@@ -26,11 +26,7 @@ show_only_clients = st.toggle("Show only clients", value=False)
 
 filtered = df.copy()
 if search:
-    mask = (
-        filtered[NAME_COL].str.contains(search, case=False, na=False)
-        | filtered[CITY_COL].str.contains(search, case=False, na=False)
-    )
-    filtered = filtered[mask]
+    filtered = filtered[search_mask(filtered, search)]
 if show_only_clients and IS_CLIENT_COL in filtered.columns:
     filtered = filtered[filtered[IS_CLIENT_COL] == True]
 
@@ -40,23 +36,27 @@ st.subheader("Schools")
 if filtered.empty:
     st.info("No matching schools.")
 else:
-    # Action buttons inside the table
-    for idx, row in filtered.head(200).iterrows():
-        school_id = str(row[ID_COL])
-        is_client = bool(row.get(IS_CLIENT_COL, False))
-        cols = st.columns([4, 2, 2, 2, 2])
-        with cols[0]:
-            st.write(f"{row[NAME_COL]} — {row[CITY_COL]}")
-        with cols[1]:
-            st.write(f"ID: {school_id}")
-        with cols[2]:
-            st.write("Client" if is_client else "Not client")
-        with cols[3]:
-            if not is_client and st.button("Mark as client", key=f"add-{school_id}"):
-                toggle_client(df, school_id, True)
-                st.rerun()
-        with cols[4]:
-            if is_client and st.button("Remove client", type="secondary", key=f"rm-{school_id}"):
-                toggle_client(df, school_id, False)
-                st.rerun()
+    # One editable table; the client checkbox is the only writable column
+    view = filtered[[NAME_COL, CITY_COL, ID_COL, IS_CLIENT_COL]].reset_index(drop=True)
+    edited = st.data_editor(
+        view,
+        column_config={
+            NAME_COL: st.column_config.Column("School"),
+            CITY_COL: st.column_config.Column("City"),
+            ID_COL: st.column_config.Column("ID"),
+            IS_CLIENT_COL: st.column_config.CheckboxColumn("Client"),
+        },
+        disabled=[NAME_COL, CITY_COL, ID_COL],
+        hide_index=True,
+        width='stretch',
+        key="clients_editor",
+    )
 
+    # Toggle only the rows whose checkbox changed
+    changed = edited[IS_CLIENT_COL].to_numpy() != view[IS_CLIENT_COL].to_numpy()
+    if changed.any():
+        for school_id, make_client in zip(edited.loc[changed, ID_COL], edited.loc[changed, IS_CLIENT_COL]):
+            toggle_client(df, str(school_id), bool(make_client))
+        # Edits are now in the data itself; drop them from the widget state
+        del st.session_state["clients_editor"]
+        st.rerun()
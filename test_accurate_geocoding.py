@@ -6,9 +6,24 @@ Test the geocoding with Van Maerlant Lyceum and a few other schools
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import json
 
+from lib.geocoding import build_full_addresses
+
+# Keep-alive session: one TLS handshake for the whole run, retries on throttling/server errors
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
+})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=5, backoff_factor=1.5, status_forcelist=[429, 502, 503, 504])
+))
+
 def geocode_with_nominatim(address):
     """Geocode using Nominatim (OpenStreetMap) API"""
     try:
@@ -21,11 +36,7 @@ def geocode_with_nominatim(address):
             'addressdetails': 1
         }
         
-        headers = {
-            'User-Agent': 'nl-highschools-dashboard/1.0 (educational research)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _SESSION.get(url, params=params, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -39,30 +50,6 @@ def geocode_with_nominatim(address):
         print(f"Error geocoding {address}: {e}")
         return None, None
 
-def create_full_address(row):
-    """Create a full address string for geocoding"""
-    parts = []
-    
-    # Street and house number
-    if pd.notna(row['street']):
-        street_part = str(row['street']).strip()
-        if pd.notna(row['house_no']):
-            street_part += f" {str(row['house_no']).strip()}"
-            if pd.notna(row['house_add']):
-                street_part += str(row['house_add']).strip()
-        parts.append(street_part)
-    
-    # Postcode and city
-    if pd.notna(row['postcode']):
-        parts.append(str(row['postcode']).strip())
-    
-    if pd.notna(row['city']):
-        parts.append(str(row['city']).strip())
-    
-    parts.append("Netherlands")
-    
-    return ", ".join(parts)
-
 def main():
     print("🧪 Testing Accurate Geocoding")
     print("=" * 40)
@@ -70,6 +57,9 @@ def main():
     # Load dataset
     df = pd.read_csv('nl_highschools_full.csv')
     
+    # Full addresses for the whole dataset in one vectorized pass
+    df['full_address'] = build_full_addresses(df)
+    
     # Find Van Maerlant Lyceum
     van_maerlant = df[df['school_name'].str.contains('Van Maerlant', case=False, na=False)]
     
@@ -80,7 +70,7 @@ def main():
             print(f"    Address: {school['street']} {school['house_no']}, {school['postcode']} {school['city']}")
             
             # Create full address
-            full_address = create_full_address(school)
+            full_address = school['full_address']
             print(f"    Full address for geocoding: {full_address}")
             
             # Geocode
@@ -103,7 +93,7 @@ def main():
         print(f"\n🏫 {school['school_name']}")
         print(f"   📍 {school['city']}")
         
-        full_address = create_full_address(school)
+        full_address = school['full_address']
         print(f"   🔍 Geocoding: {full_address}")
         
         coords, display_name = geocode_with_nominatim(full_address)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+🧪 Test Map Building on Both Loaders
+Builds the folium map from the app's frame and from lib.data.load_schools (numpy and Arrow dtypes)
+"""
+
+import app
+from lib.data import load_schools
+from lib.maps import build_map
+
+def loaded_frames():
+    """(label, frame) for every loader whose output reaches build_map"""
+    return [
+        ("app.load_data", app.load_data(0)),
+        ("load_schools", load_schools()),
+        ("load_schools (pyarrow)", load_schools(dtype_backend='pyarrow')),
+    ]
+
+def test_build_map_on_loaders():
+    for label, df in loaded_frames():
+        m = build_map(df)
+        assert m is not None, f"{label}: no map built"
+        html = m.get_root().render()
+        assert "FastMarkerCluster" in html or "markerClusterGroup" in html, f"{label}: no markers rendered"
+
+def main():
+    print("🧪 Testing build_map on loader output")
+    print("=" * 40)
+    
+    for label, df in loaded_frames():
+        m = build_map(df)
+        status = "✅" if m is not None else "❌"
+        print(f"{status} {label}: {len(df):,} schools, city dtype {df['city'].dtype}")
+    
+    test_build_map_on_loaders()
+    print("✅ All maps built")
+
+if __name__ == "__main__":
+    main()